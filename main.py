@@ -1,21 +1,70 @@
+import asyncio
+import logging
 import os
-from typing import List, Optional
+import re
+import string
+import time
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, get_args
+import bson
+import orjson
+from cachetools import TTLCache
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from bson import ObjectId
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from bson import Decimal128, ObjectId
+from bson.raw_bson import RawBSONDocument
+from pymongo.errors import BulkWriteError, OperationFailure
 
 # Database
 from database import db
 
-app = FastAPI(title="E-Commerce API", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Setup and snapshot refreshes run in the background so an unreachable
+    # database never holds up startup
+    background = None
+    if db is not None:
+        background = asyncio.create_task(prepare_products())
+
+    yield
+
+    if background is not None:
+        background.cancel()
+        with suppress(asyncio.CancelledError):
+            await background
+
+
+app = FastAPI(
+    title="E-Commerce API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+# Explicit lists let CORSMiddleware answer with prebuilt headers instead of
+# echoing whatever the request asked for; the API is read-only and cookieless.
+# FRONTEND_ORIGIN is a comma-separated origin list; without it every origin is
+# allowed, as before it existed
+FRONTEND_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("FRONTEND_ORIGIN", "").split(",")
+    if origin.strip()
+]
+if not FRONTEND_ORIGINS:
+    logger.warning("FRONTEND_ORIGIN is not set; allowing CORS requests from any origin")
+    FRONTEND_ORIGINS = ["*"]
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=FRONTEND_ORIGINS,
+    allow_credentials=False,
+    allow_methods=["GET"],
+    allow_headers=["Authorization", "Content-Type"],
 )
 
 
@@ -23,6 +72,10 @@ app.add_middleware(
 # Helpers
 # -----------------------------
 class ProductOut(BaseModel):
+    # Built from plain Mongo documents, so attribute access is not needed;
+    # extra keys (search fields, text score) are dropped
+    model_config = ConfigDict(extra="ignore", populate_by_name=True)
+
     id: str
     title: str
     description: Optional[str] = None
@@ -33,123 +86,455 @@ class ProductOut(BaseModel):
     brand: Optional[str] = None
     rating: Optional[float] = None
 
-    class Config:
-        from_attributes = True
-
-
-def serialize_product(doc) -> ProductOut:
-    return ProductOut(
-        id=str(doc.get("_id")),
-        title=doc.get("title", ""),
-        description=doc.get("description"),
-        price=float(doc.get("price", 0)),
-        category=doc.get("category", "General"),
-        in_stock=bool(doc.get("in_stock", True)),
-        image_url=doc.get("image_url"),
-        brand=doc.get("brand"),
-        rating=float(doc.get("rating", 0)) if doc.get("rating") is not None else None,
+
+# Fallbacks for required ProductOut fields missing from a document
+_REQUIRED_DEFAULTS = {"title": "", "price": 0.0, "category": "General"}
+
+# Casts applied to stored values, keyed by the (non-Optional) field type
+_CASTS = {bool: "_bool"}
+
+
+def to_float(value) -> float:
+    """float() that also accepts BSON Decimal128; raises on anything else."""
+    if isinstance(value, Decimal128):
+        value = value.to_decimal()
+    return float(value)
+
+
+def _as_float(value, fallback):
+    """Slow path for numeric values the startup migration left as non-doubles."""
+    try:
+        return to_float(value)
+    except (TypeError, ValueError):
+        return fallback
+
+
+# Product images are stored as a bare Unsplash photo id; the full URL is
+# rebuilt from these when serializing
+_UNSPLASH_PREFIX = "https://images.unsplash.com/photo-"
+_UNSPLASH_SUFFIX = "?q=80&w=1200&auto=format&fit=crop"
+
+# Fields whose expression is not derived from the model, e.g. because they
+# are computed from other stored keys
+_FIELD_EXPRS = {
+    "image_url": (
+        '_UNSPLASH_PREFIX + i + _UNSPLASH_SUFFIX'
+        ' if (i := g("image_id")) is not None else g("image_url")'
+    ),
+}
+
+
+def _build_serializer():
+    """Generate serialize_product(doc) -> dict specialised to ProductOut.
+
+    Each field becomes an inline expression, so the hot loop runs no
+    per-field dispatch, no repeated doc.get(key, default) calls and no
+    model construction. Helpers are bound as default arguments and doc.get
+    as a local, so the body only does fast local loads.
+    """
+    items = ['"id": _str(doc["_id"])']
+    for name, field in ProductOut.model_fields.items():
+        if name == "id":
+            continue
+        if name in _FIELD_EXPRS:
+            items.append(f"{name!r}: {_FIELD_EXPRS[name]}")
+            continue
+        args = get_args(field.annotation)
+        optional = type(None) in args
+        kind = next(a for a in args if a is not type(None)) if optional else field.annotation
+        cast = _CASTS.get(kind)
+        default = _REQUIRED_DEFAULTS[name] if field.is_required() else field.default
+        if kind is float:
+            # Stored as doubles (see FLOAT_FIELDS), so only a type check on
+            # the common path
+            if optional:
+                check = f"(v := g({name!r})) is None or _type(v) is _float"
+            else:
+                check = f"_type(v := g({name!r}, {default!r})) is _float"
+            expr = f"v if {check} else _as_float(v, {default!r})"
+        elif cast and optional:
+            expr = f"None if (v := g({name!r})) is None else {cast}(v)"
+        elif cast:
+            expr = f"{cast}(doc[{name!r}]) if {name!r} in doc else {kind(default)!r}"
+        elif default is None:
+            expr = f"g({name!r})"
+        else:
+            expr = f"doc[{name!r}] if {name!r} in doc else {default!r}"
+        items.append(f"{name!r}: {expr}")
+
+    namespace = {
+        "_str": str,
+        "_float": float,
+        "_bool": bool,
+        "_type": type,
+        "_as_float": _as_float,
+        "_UNSPLASH_PREFIX": _UNSPLASH_PREFIX,
+        "_UNSPLASH_SUFFIX": _UNSPLASH_SUFFIX,
+    }
+    params = ", ".join(["doc"] + [f"{name}={name}" for name in namespace])
+    src = "def serialize_product(%s):\n    g = doc.get\n    return {\n%s\n    }\n" % (
+        params,
+        ",\n".join(f"        {item}" for item in items),
     )
+    exec(compile(src, "<serialize_product>", "exec"), namespace)
+    return namespace["serialize_product"]
+
+
+serialize_product = _build_serializer()
+
+
+# Encoded JSON bodies of recent product responses; products change rarely, so
+# a short TTL keeps them fresh enough while sparing MongoDB repeat queries
+_response_cache: TTLCache = TTLCache(maxsize=512, ttl=30)
+# Per-key [lock, holders] pairs; an entry lives only while someone holds or
+# waits on its lock, so every concurrent request for a key shares one lock
+_cache_locks: Dict[Hashable, list] = {}
+
+
+@asynccontextmanager
+async def _key_lock(key: Hashable):
+    entry = _cache_locks.get(key)
+    if entry is None:
+        entry = _cache_locks[key] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and _cache_locks.get(key) is entry:
+            del _cache_locks[key]
+
+
+async def cached_json(key: Hashable, build: Callable[[], Awaitable[object]]) -> Response:
+    """Return the cached JSON body for key, building it at most once per miss.
+
+    Concurrent misses on the same key wait on a shared lock instead of all
+    querying MongoDB. Exceptions raised by build (e.g. a 404) are not cached.
+    """
+    body = _response_cache.get(key)
+    if body is None:
+        async with _key_lock(key):
+            body = _response_cache.get(key)
+            if body is None:
+                body = orjson.dumps(await build())
+                _response_cache[key] = body
+    return Response(content=body, media_type="application/json")
+
+
+# Documents encoded per streamed chunk
+STREAM_BATCH_SIZE = 100
+
+
+def _encode_products(docs: List[dict]) -> bytes:
+    dumps, serialize = orjson.dumps, serialize_product
+    return b",".join([dumps(serialize(d)) for d in docs])
+
+
+async def _stream_products(key: Hashable, first: List[dict], cursor) -> AsyncIterator[bytes]:
+    """Encode cursor results as a JSON array batch by batch, caching the body.
+
+    The response is written while MongoDB is still being read, so no full
+    list of documents or dicts is ever held. first is the batch the caller
+    already fetched, so query errors surface before the response starts.
+    No lock is held here: a slow client only delays itself.
+    """
+    try:
+        chunks = [b"[" + _encode_products(first)]
+        yield chunks[0]
+        while docs := await cursor.to_list(length=STREAM_BATCH_SIZE):
+            chunk = b"," + _encode_products(docs)
+            chunks.append(chunk)
+            yield chunk
+        chunks.append(b"]")
+        yield b"]"
+        _response_cache[key] = b"".join(chunks)
+    finally:
+        # Releases the server-side cursor if the client disconnects mid-stream
+        await cursor.close()
+
+
+# Only the fields ProductOut renders are fetched from MongoDB
+PRODUCT_PROJECTION = {
+    "title": 1,
+    "description": 1,
+    "price": 1,
+    "category": 1,
+    "in_stock": 1,
+    "image_id": 1,
+    "image_url": 1,
+    "brand": 1,
+    "rating": 1,
+}
+
+
+# Shape of a valid ObjectId string; checked before parsing so malformed ids
+# are rejected without raising inside bson
+_HEX24 = re.compile(r"[0-9a-fA-F]{24}")
+
+
+# Fields searched by `q`; each is mirrored into a lowercased `<field>_lc` copy
+# so short queries can run as an anchored, index-backed prefix match
+SEARCH_FIELDS = ("title", "category", "brand")
+
+# ASCII-only lowercasing, matching MongoDB's `$toLower` so that values folded
+# here, by the backfill and from `q` always agree
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def fold_case(value: str) -> str:
+    return value.translate(_ASCII_LOWER)
+
+
+# Numeric fields stored as doubles
+FLOAT_FIELDS = ("price", "rating")
+
+
+def prepare_product(doc: dict) -> dict:
+    """Normalise a product document for storage; every writer goes through it."""
+    for field in FLOAT_FIELDS:
+        if doc.get(field) is not None:
+            doc[field] = to_float(doc[field])
+    for field in SEARCH_FIELDS:
+        doc[f"{field}_lc"] = fold_case(doc.get(field) or "")
+    return doc
 
 
 # -----------------------------
 # Seed data on startup (if empty)
 # -----------------------------
-@app.on_event("startup")
-def seed_products_if_needed():
+SAMPLE_PRODUCTS = (
+    {
+        "title": "Classic Tee",
+        "description": "Soft cotton tee with a perfect everyday fit.",
+        "price": 19.99,
+        "category": "Apparel",
+        "in_stock": True,
+        "image_id": "1512436991641-6745cdb1723f",
+        "brand": "BlueWave",
+        "rating": 4.5,
+    },
+    {
+        "title": "Running Sneakers",
+        "description": "Lightweight shoes designed for comfort and speed.",
+        "price": 59.99,
+        "category": "Footwear",
+        "in_stock": True,
+        "image_id": "1542291026-7eec264c27ff",
+        "brand": "SwiftStep",
+        "rating": 4.3,
+    },
+    {
+        "title": "Wireless Headphones",
+        "description": "Noise-cancelling over-ear headphones with 30h battery.",
+        "price": 129.0,
+        "category": "Electronics",
+        "in_stock": True,
+        "image_id": "1518442031670-681f9a19dbcc",
+        "brand": "SonicX",
+        "rating": 4.7,
+    },
+    {
+        "title": "Smart Watch",
+        "description": "Track health, messages, and workouts with ease.",
+        "price": 149.99,
+        "category": "Electronics",
+        "in_stock": True,
+        "image_id": "1511732351157-1865efcb7b7b",
+        "brand": "PulseOne",
+        "rating": 4.2,
+    },
+    {
+        "title": "Backpack",
+        "description": "Durable backpack with multiple compartments.",
+        "price": 39.5,
+        "category": "Accessories",
+        "in_stock": True,
+        "image_id": "1511174511562-5f7f18b874f8",
+        "brand": "TrailPro",
+        "rating": 4.1,
+    },
+    {
+        "title": "Sunglasses",
+        "description": "UV400 polarized sunglasses with classic style.",
+        "price": 24.99,
+        "category": "Accessories",
+        "in_stock": True,
+        "image_id": "1511499767150-a48a237f0083",
+        "brand": "SunRay",
+        "rating": 4.0,
+    },
+    {
+        "title": "Water Bottle",
+        "description": "Insulated stainless steel bottle (1L).",
+        "price": 18.0,
+        "category": "Outdoors",
+        "in_stock": True,
+        "image_id": "1542736667-069246bdbc74",
+        "brand": "HydroFlow",
+        "rating": 4.6,
+    },
+    {
+        "title": "Desk Lamp",
+        "description": "Adjustable LED lamp with warm and cool modes.",
+        "price": 32.0,
+        "category": "Home",
+        "in_stock": True,
+        "image_id": "1507473885765-e6ed057f782c",
+        "brand": "GlowLite",
+        "rating": 4.4,
+    },
+)
+
+# SAMPLE_PRODUCTS pre-encoded to BSON, built on first use only
+_SEED: Optional[Tuple[RawBSONDocument, ...]] = None
+
+
+def _seed_documents() -> Tuple[RawBSONDocument, ...]:
+    global _SEED
+    if _SEED is None:
+        _SEED = tuple(
+            RawBSONDocument(bson.encode(prepare_product({**p, "seed_key": p["title"]})))
+            for p in SAMPLE_PRODUCTS
+        )
+    return _SEED
+
+
+async def _setup_step(description: str, op: Awaitable[object]) -> bool:
+    """Await one startup setup operation, logging instead of raising on failure.
+
+    Each step is isolated so that, e.g., an index conflict does not skip the
+    backfills or the seed that follow it. Only server-side failures are
+    isolated: connection errors propagate so the remaining steps are abandoned
+    instead of each waiting out its own server selection timeout.
+    """
+    try:
+        await op
+    except OperationFailure:
+        logger.exception("Product setup failed: %s", description)
+        return False
+    return True
+
+
+async def _insert_seed_products():
+    # Unordered so that when several workers seed at once, each inserts
+    # whatever the others have not; the seed_key index rejects the rest
+    try:
+        await db["product"].insert_many(
+            _seed_documents(),
+            ordered=False,
+            bypass_document_validation=True,
+        )
+    except BulkWriteError as e:
+        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+
+
+async def seed_products_if_needed():
     if db is None:
         # Database not configured; raise at runtime when endpoints are called
         return
 
+    products = db["product"]
+
+    # Text index backs `q` searches; the title index serves the unfiltered,
+    # title-sorted list
+    await _setup_step("text index", products.create_index(
+        [("title", "text"), ("category", "text"), ("brand", "text")],
+        name="prod_text",
+    ))
+    await _setup_step("title index", products.create_index("title"))
+    for field in SEARCH_FIELDS:
+        await _setup_step(f"{field}_lc index", products.create_index(f"{field}_lc"))
+    # Only seeded documents carry seed_key, so this keeps concurrent seeds
+    # idempotent without constraining the rest of the catalogue
+    await _setup_step("seed_key index", products.create_index(
+        "seed_key",
+        unique=True,
+        partialFilterExpression={"seed_key": {"$exists": True}},
+    ))
+
+    # Backfill lowercased search fields on documents written without them
+    await _setup_step("search field backfill", products.update_many(
+        {"title_lc": {"$exists": False}},
+        [{"$set": {f"{field}_lc": {"$toLower": f"${field}"} for field in SEARCH_FIELDS}}],
+    ))
+    # Migrate legacy numeric fields (ints, strings, decimals) to doubles;
+    # values that cannot be converted are left as they are and reported
+    for field in FLOAT_FIELDS:
+        legacy = {field: {"$exists": True, "$not": {"$type": ["double", "null"]}}}
+        migrated = await _setup_step(f"{field} migration", products.update_many(
+            legacy,
+            [{"$set": {field: {"$convert": {"input": f"${field}", "to": "double", "onError": f"${field}"}}}}],
+        ))
+        if migrated:
+            remaining = await products.count_documents(legacy)
+            if remaining:
+                logger.warning("%d products have a %s that is not a number", remaining, field)
+
+    if await products.count_documents({}) == 0:
+        await _setup_step("seed", _insert_seed_products())
+
+
+async def prepare_products():
+    """Background startup work: set up the collection, then keep the snapshot fresh."""
     try:
-        count = db["product"].count_documents({})
-        if count == 0:
-            sample_products = [
-                {
-                    "title": "Classic Tee",
-                    "description": "Soft cotton tee with a perfect everyday fit.",
-                    "price": 19.99,
-                    "category": "Apparel",
-                    "in_stock": True,
-                    "image_url": "https://images.unsplash.com/photo-1512436991641-6745cdb1723f?q=80&w=1200&auto=format&fit=crop",
-                    "brand": "BlueWave",
-                    "rating": 4.5,
-                },
-                {
-                    "title": "Running Sneakers",
-                    "description": "Lightweight shoes designed for comfort and speed.",
-                    "price": 59.99,
-                    "category": "Footwear",
-                    "in_stock": True,
-                    "image_url": "https://images.unsplash.com/photo-1542291026-7eec264c27ff?q=80&w=1200&auto=format&fit=crop",
-                    "brand": "SwiftStep",
-                    "rating": 4.3,
-                },
-                {
-                    "title": "Wireless Headphones",
-                    "description": "Noise-cancelling over-ear headphones with 30h battery.",
-                    "price": 129.0,
-                    "category": "Electronics",
-                    "in_stock": True,
-                    "image_url": "https://images.unsplash.com/photo-1518442031670-681f9a19dbcc?q=80&w=1200&auto=format&fit=crop",
-                    "brand": "SonicX",
-                    "rating": 4.7,
-                },
-                {
-                    "title": "Smart Watch",
-                    "description": "Track health, messages, and workouts with ease.",
-                    "price": 149.99,
-                    "category": "Electronics",
-                    "in_stock": True,
-                    "image_url": "https://images.unsplash.com/photo-1511732351157-1865efcb7b7b?q=80&w=1200&auto=format&fit=crop",
-                    "brand": "PulseOne",
-                    "rating": 4.2,
-                },
-                {
-                    "title": "Backpack",
-                    "description": "Durable backpack with multiple compartments.",
-                    "price": 39.5,
-                    "category": "Accessories",
-                    "in_stock": True,
-                    "image_url": "https://images.unsplash.com/photo-1511174511562-5f7f18b874f8?q=80&w=1200&auto=format&fit=crop",
-                    "brand": "TrailPro",
-                    "rating": 4.1,
-                },
-                {
-                    "title": "Sunglasses",
-                    "description": "UV400 polarized sunglasses with classic style.",
-                    "price": 24.99,
-                    "category": "Accessories",
-                    "in_stock": True,
-                    "image_url": "https://images.unsplash.com/photo-1511499767150-a48a237f0083?q=80&w=1200&auto=format&fit=crop",
-                    "brand": "SunRay",
-                    "rating": 4.0,
-                },
-                {
-                    "title": "Water Bottle",
-                    "description": "Insulated stainless steel bottle (1L).",
-                    "price": 18.0,
-                    "category": "Outdoors",
-                    "in_stock": True,
-                    "image_url": "https://images.unsplash.com/photo-1542736667-069246bdbc74?q=80&w=1200&auto=format&fit=crop",
-                    "brand": "HydroFlow",
-                    "rating": 4.6,
-                },
-                {
-                    "title": "Desk Lamp",
-                    "description": "Adjustable LED lamp with warm and cool modes.",
-                    "price": 32.0,
-                    "category": "Home",
-                    "in_stock": True,
-                    "image_url": "https://images.unsplash.com/photo-1507473885765-e6ed057f782c?q=80&w=1200&auto=format&fit=crop",
-                    "brand": "GlowLite",
-                    "rating": 4.4,
-                },
-            ]
-            if sample_products:
-                db["product"].insert_many(sample_products)
+        await seed_products_if_needed()
     except Exception:
-        # Ignore seed failures to avoid crashing startup
-        pass
+        # Typically the database is unreachable; logged once, not per step
+        logger.exception("Product setup abandoned")
+
+    # Unfiltered lists fall back to querying MongoDB until a refresh succeeds
+    await _refresh_product_snapshot_logged()
+    await refresh_product_snapshot_periodically()
+
+
+# -----------------------------
+# Pre-encoded product snapshot
+# -----------------------------
+# Unfiltered list requests are served by slicing this title-sorted tuple of
+# encoded products instead of querying MongoDB. It is rebuilt on startup,
+# every SNAPSHOT_REFRESH_SECONDS, and should be refreshed after any write.
+SNAPSHOT_REFRESH_SECONDS = 60
+SNAPSHOT_MAX_PRODUCTS = 5000
+# Once refreshes have failed for this long the snapshot is dropped and
+# unfiltered lists go back to querying MongoDB
+SNAPSHOT_MAX_AGE_SECONDS = 3 * SNAPSHOT_REFRESH_SECONDS
+
+_snapshot: Optional[Tuple[bytes, ...]] = None
+# False when the catalogue outgrew SNAPSHOT_MAX_PRODUCTS, in which case only
+# pages fully inside the snapshot are served from it
+_snapshot_complete = False
+_snapshot_built_at = 0.0
+
+
+async def refresh_product_snapshot():
+    global _snapshot, _snapshot_complete, _snapshot_built_at
+    docs = await db["product"].find({}, PRODUCT_PROJECTION).sort("title").to_list(
+        length=SNAPSHOT_MAX_PRODUCTS + 1
+    )
+    dumps, serialize = orjson.dumps, serialize_product
+    _snapshot_complete = len(docs) <= SNAPSHOT_MAX_PRODUCTS
+    _snapshot = tuple([dumps(serialize(d)) for d in docs[:SNAPSHOT_MAX_PRODUCTS]])
+    _snapshot_built_at = time.monotonic()
+
+
+async def _refresh_product_snapshot_logged():
+    global _snapshot
+    try:
+        await refresh_product_snapshot()
+    except Exception:
+        logger.exception("Product snapshot refresh failed")
+        # Keep serving the previous snapshot, but not indefinitely
+        if _snapshot is not None and time.monotonic() - _snapshot_built_at > SNAPSHOT_MAX_AGE_SECONDS:
+            logger.warning("Dropping product snapshot older than %ds", SNAPSHOT_MAX_AGE_SECONDS)
+            _snapshot = None
+
+
+async def refresh_product_snapshot_periodically():
+    while True:
+        await asyncio.sleep(SNAPSHOT_REFRESH_SECONDS)
+        await _refresh_product_snapshot_logged()
 
 
 @app.get("/")
@@ -162,77 +547,126 @@ def hello():
     return {"message": "Hello from the backend API!"}
 
 
-@app.get("/api/products", response_model=List[ProductOut])
-def list_products(q: Optional[str] = Query(None, description="Search query")):
+def _product_cursor(q: Optional[str]):
+    if q and len(q.split()) == 1:
+        # `$text` only matches whole (stemmed) words, so a single-token query
+        # also matches field prefixes, keeping results steady while the user
+        # types ("wat", "wate", "water"). Prefixes are anchored to the start
+        # of a field (a range seek on the `_lc` indexes), so a word inside a
+        # field is only found once typed in full. Every clause is index-backed.
+        prefix = {"$regex": f"^{re.escape(fold_case(q.strip()))}"}
+        return db["product"].find(
+            {"$or": [
+                {"$text": {"$search": q}},
+                *({f"{field}_lc": prefix} for field in SEARCH_FIELDS),
+            ]},
+            PRODUCT_PROJECTION,
+        ).sort("title")
+    if q:
+        # Multi-word text search over title, category and brand, best matches first
+        return db["product"].find(
+            {"$text": {"$search": q}},
+            {**PRODUCT_PROJECTION, "score": {"$meta": "textScore"}},
+        ).sort([("score", {"$meta": "textScore"})])
+    return db["product"].find({}, PRODUCT_PROJECTION).sort("title")
+
+
+# Shaped by serialize_product and returned as pre-encoded or streamed JSON, so
+# FastAPI neither re-validates nor re-encodes the body; `responses` keeps the
+# OpenAPI schema
+@app.get(
+    "/api/products",
+    response_model=None,
+    responses={200: {"model": List[ProductOut]}},
+)
+async def list_products(
+    q: Optional[str] = Query(None, description="Search query"),
+    limit: int = Query(200, ge=1, le=500, description="Maximum number of products"),
+    offset: int = Query(0, ge=0, description="Number of products to skip"),
+):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not configured")
 
-    filter_query = {}
-    if q:
-        # Case-insensitive match on title and category
-        filter_query = {
-            "$or": [
-                {"title": {"$regex": q, "$options": "i"}},
-                {"category": {"$regex": q, "$options": "i"}},
-                {"brand": {"$regex": q, "$options": "i"}},
-            ]
-        }
-
-    docs = list(db["product"].find(filter_query).sort("title"))
-    return [serialize_product(d) for d in docs]
-
-
-@app.get("/api/products/{product_id}", response_model=ProductOut)
-def get_product(product_id: str):
+    snapshot = _snapshot
+    if not q and snapshot is not None and (_snapshot_complete or offset + limit <= len(snapshot)):
+        body = b"[" + b",".join(snapshot[offset:offset + limit]) + b"]"
+        return Response(content=body, media_type="application/json")
+
+    key = ("list", q, limit, offset)
+    body = _response_cache.get(key)
+    if body is None:
+        async with _key_lock(key):
+            body = _response_cache.get(key)
+            if body is None:
+                cursor = _product_cursor(q).skip(offset).limit(limit)
+                # Fetched before responding, so query errors still become a 500
+                first = await cursor.to_list(length=STREAM_BATCH_SIZE)
+                if len(first) < STREAM_BATCH_SIZE:
+                    # Everything fit in one batch: cache it while other
+                    # requests for this key are still waiting on the lock
+                    body = b"[" + _encode_products(first) + b"]"
+                    _response_cache[key] = body
+    if body is not None:
+        return Response(content=body, media_type="application/json")
+
+    return StreamingResponse(_stream_products(key, first, cursor), media_type="application/json")
+
+
+@app.get(
+    "/api/products/{product_id}",
+    response_model=None,
+    responses={200: {"model": ProductOut}},
+)
+async def get_product(product_id: str):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not configured")
 
-    try:
-        oid = ObjectId(product_id)
-    except Exception:
+    if not _HEX24.fullmatch(product_id):
         raise HTTPException(status_code=400, detail="Invalid product id")
+    oid = ObjectId(bytes.fromhex(product_id))
 
-    doc = db["product"].find_one({"_id": oid})
-    if not doc:
-        raise HTTPException(status_code=404, detail="Product not found")
+    async def build():
+        doc = await db["product"].find_one({"_id": oid})
+        if not doc:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return serialize_product(doc)
 
-    return serialize_product(doc)
+    return await cached_json(("product", oid), build)
+
+
+# Everything /test reports that is fixed at import time; each request only
+# fills in the live collection probe
+_DB_URL_SET = bool(os.getenv("DATABASE_URL"))
+_DB_NAME_SET = bool(os.getenv("DATABASE_NAME"))
+_TEST_RESPONSE = {
+    "backend": "✅ Running",
+    "database": "✅ Available" if db is not None else "⚠️  Available but not initialized",
+    "database_url": "✅ Set" if _DB_URL_SET else "❌ Not Set",
+    "database_name": "✅ Set" if _DB_NAME_SET else "❌ Not Set",
+    "connection_status": "Connected" if db is not None else "Not Connected",
+    "collections": [],
+}
 
 
 @app.get("/test")
-def test_database():
+async def test_database():
     """Test endpoint to check if database is available and accessible"""
-    response = {
-        "backend": "✅ Running",
-        "database": "❌ Not Available",
-        "database_url": None,
-        "database_name": None,
-        "connection_status": "Not Connected",
-        "collections": []
-    }
-
-    try:
-        if db is not None:
-            response["database"] = "✅ Available"
-            response["database_url"] = "✅ Configured"
-            response["database_name"] = db.name if hasattr(db, 'name') else "✅ Connected"
-            response["connection_status"] = "Connected"
-
-            try:
-                collections = db.list_collection_names()
-                response["collections"] = collections[:10]
-                response["database"] = "✅ Connected & Working"
-            except Exception as e:
-                response["database"] = f"⚠️  Connected but Error: {str(e)[:50]}"
+    response = _TEST_RESPONSE.copy()
+
+    if db is not None:
+        # Independent round-trips, so run them concurrently
+        collections, ping = await asyncio.gather(
+            db.list_collection_names(),
+            db.command("ping"),
+            return_exceptions=True,
+        )
+        if isinstance(ping, Exception):
+            response["connection_status"] = f"⚠️  Ping failed: {str(ping)[:50]}"
+        if isinstance(collections, Exception):
+            response["database"] = f"⚠️  Connected but Error: {str(collections)[:50]}"
         else:
-            response["database"] = "⚠️  Available but not initialized"
-
-    except Exception as e:
-        response["database"] = f"❌ Error: {str(e)[:50]}"
-
-    import os as _os
-    response["database_url"] = "✅ Set" if _os.getenv("DATABASE_URL") else "❌ Not Set"
-    response["database_name"] = "✅ Set" if _os.getenv("DATABASE_NAME") else "❌ Not Set"
+            response["collections"] = collections[:10]
+            response["database"] = "✅ Connected & Working"
 
     return response
 
@@ -240,4 +674,12 @@ def test_database():
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        # uvloop where installed (it is skipped on Windows), asyncio otherwise
+        loop="auto",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", 2)),
+    )